@@ -1,19 +1,30 @@
+import asyncio
+import hashlib
 import logging
 import os
-import json
 import gspread
 import re
-from datetime import datetime
-from typing import List, Dict, Any
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Callable
+from urllib.parse import urlsplit, urlunsplit
 
-from fastapi import FastAPI, BackgroundTasks
+import httpx
+import orjson
+from cachetools import TTLCache
+import msgspec
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import Counter, make_asgi_app
 from pydantic import BaseModel
-from serpapi import GoogleSearch
-from concurrent.futures import ThreadPoolExecutor
+from redis.asyncio import Redis
 
 # --- Configuration & App Initialization ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# httpx logs every request URL at INFO, and SerpApi URLs carry the API key.
+logging.getLogger("httpx").setLevel(logging.WARNING)
 app = FastAPI()
 
 app.add_middleware(
@@ -24,124 +35,481 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class ScrapeRequest(BaseModel):
+SERPAPI_URL = "https://serpapi.com/search.json"
+
+# Shared client so keep-alive connections (and their TLS handshakes) are reused across URLs and requests.
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    timeout=30,
+)
+
+# Caps in-flight SerpApi calls across all requests, so a huge URL list cannot fan out without bound.
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "16"))
+# A SerpApi call still running this many seconds after getting a slot is cancelled, so one stalled call
+# cannot hold up the response. Time spent waiting for a slot does not count.
+SCRAPE_TIMEOUT_SECONDS = float(os.environ.get("SCRAPE_TIMEOUT_SECONDS", "15"))
+_scrape_slots = asyncio.Semaphore(SCRAPE_WORKERS)
+
+# --- Response Cache ---
+# Scrape results are cached in two layers: a small in-process TTL cache for the hottest hotels, backed by
+# Redis when REDIS_URL is set. Without Redis, only the in-process layer is used.
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "21600"))
+redis_client = Redis.from_url(REDIS_URL) if REDIS_URL else None
+
+MEMORY_CACHE_SIZE = int(os.environ.get("MEMORY_CACHE_SIZE", "1024"))
+MEMORY_CACHE_TTL_SECONDS = int(os.environ.get("MEMORY_CACHE_TTL_SECONDS", "60"))
+_MEMORY_CACHE_LOCK = threading.Lock()
+_memory_cache = TTLCache(maxsize=MEMORY_CACHE_SIZE, ttl=MEMORY_CACHE_TTL_SECONDS)
+
+CACHE_HITS = Counter("scrape_cache_hits_total", "Scrape results served from a cache layer.", ["layer"])
+CACHE_MISSES = Counter("scrape_cache_misses_total", "Scrape results that had to be fetched from SerpApi.")
+app.mount("/metrics", make_asgi_app())
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await http_client.aclose()
+    if redis_client is not None:
+        await redis_client.aclose()
+
+# --- URL Parsing ---
+# One pass classifies the source; each group maps positionally onto _SRC_NAMES.
+_SRC_RE = re.compile(r'(booking\.com)|(tripadvisor)|(google\.com)')
+_SRC_NAMES = ("Booking.com", "TripAdvisor", "Google Reviews")
+
+_TA_RE = re.compile(r'-Reviews-(.*?)-')
+_BK_RE = re.compile(r'/hotel/\w{2}/(.*?)\.html')
+_G_RE = re.compile(r'(ChIJ[a-zA-Z0-9_-]+)')
+
+# Returned when no hotel name or Place ID could be extracted; never worth a SerpApi call.
+DEFAULT_QUERY_TERM = "hotel"
+
+# source -> (pattern, match group holding the term, word separator to replace with spaces)
+_QUERY_TERM_PATTERNS = {
+    "TripAdvisor": (_TA_RE, 1, '_'),
+    "Booking.com": (_BK_RE, 1, '-'),
+    "Google Reviews": (_G_RE, 0, None),
+}
+
+# Decoded with msgspec straight from the request body, which is much cheaper than Pydantic for large URL lists.
+class ScrapeRequest(msgspec.Struct):
     urls: List[str]
 
+# FastAPI cannot see a body it does not parse, so the schema is handed to OpenAPI explicitly.
+SCRAPE_REQUEST_SCHEMA = msgspec.json.schema_components([ScrapeRequest])[1]["ScrapeRequest"]
+
+# Declared as the response model so FastAPI serializes straight to JSON bytes through pydantic-core.
+# The parsers normalize every field before results are cached, so these types always hold.
+class HotelResult(BaseModel):
+    name: Optional[str] = None
+    source: str
+    rating: Optional[float] = None
+    count: Optional[int] = None
+    address: Optional[str] = None
+    website: Optional[str] = None
+    phone: Optional[str] = None
+    distribution: Dict[str, Any]
+    reviews_snippets: Optional[str] = None
+
+class ScrapeResponse(BaseModel):
+    data: List[HotelResult]
+
 def get_source_from_url(url: str) -> str:
     """Identifies the review source from the URL."""
-    if "booking.com" in url: return "Booking.com"
-    if "tripadvisor" in url: return "TripAdvisor"
-    if "google.com" in url: return "Google Reviews"
-    return "Unknown"
+    match = _SRC_RE.search(url)
+    if not match: return "Unknown"
+    return _SRC_NAMES[match.lastindex - 1]
+
+def normalize_url(url: str, source: str) -> str:
+    """Drops the parts of a URL that never identify the hotel, so extraction patterns cannot match inside them."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    # Google URLs may carry the Place ID in the query string; the other sources identify the hotel by path alone.
+    query = parts.query if source == "Google Reviews" else ""
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
 
 def extract_query_term_from_url(url: str) -> str:
     """Extracts a clean hotel name or Place ID from various URL formats."""
+    source = get_source_from_url(url)
+    entry = _QUERY_TERM_PATTERNS.get(source)
+    if entry:
+        pattern, group, separator = entry
+        match = pattern.search(normalize_url(url, source))
+        if match:
+            term = match.group(group)
+            return term.replace(separator, ' ') if separator else term
+    return DEFAULT_QUERY_TERM
+
+def cache_key(source: str, query_term: str) -> str:
+    """Builds the Redis key for a (source, query term) pair; the term is hashed so keys stay small however long the URL."""
+    digest = hashlib.blake2b(query_term.encode(), digest_size=16).hexdigest()
+    return f"scrape:{source}:{digest}"
+
+def cache_key_for_url(url: str) -> Optional[str]:
+    """Returns the Redis key for a URL, or None if the URL cannot be scraped."""
+    source = get_source_from_url(url)
+    query_term = extract_query_term_from_url(url)
+    if source == "Unknown" or not query_term or query_term == DEFAULT_QUERY_TERM:
+        return None
+    return cache_key(source, query_term)
+
+async def get_cached_results(keys: List[Optional[str]]) -> List[Optional[Dict[str, Any]]]:
+    """Looks up all keys in memory, then the rest with a single MGET; misses, missing keys and cache failures come back as None."""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(keys)
+    pending: Dict[str, List[int]] = {}
+    with _MEMORY_CACHE_LOCK:
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            cached = _memory_cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+    CACHE_HITS.labels("memory").inc(sum(1 for key in keys if key is not None) - sum(map(len, pending.values())))
+
+    if not pending:
+        return results
+    if redis_client is None:
+        CACHE_MISSES.inc(len(pending))
+        return results
+
+    lookup = list(pending)
+    try:
+        blobs = await redis_client.mget(lookup)
+    except Exception as e:
+        logging.warning(f"Redis lookup failed for {len(lookup)} keys: {e}")
+        CACHE_MISSES.inc(len(lookup))
+        return results
+
+    hits = 0
+    for key, blob in zip(lookup, blobs):
+        if blob is None:
+            continue
+        hits += 1
+        cached = orjson.loads(blob)
+        with _MEMORY_CACHE_LOCK:
+            _memory_cache[key] = cached
+        for i in pending[key]:
+            results[i] = cached
+    CACHE_HITS.labels("redis").inc(hits)
+    CACHE_MISSES.inc(len(lookup) - hits)
+    return results
+
+async def cache_results(results: Dict[str, Dict[str, Any]]):
+    """Stores scrape results in memory and in Redis with the configured TTLs; Redis gets one pipelined round-trip."""
+    if not results:
+        return
+    with _MEMORY_CACHE_LOCK:
+        _memory_cache.update(results)
+    if redis_client is None:
+        return
     try:
-        if "tripadvisor" in url:
-            match = re.search(r'-Reviews-(.*?)-', url)
-            if match: return match.group(1).replace('_', ' ')
-        if "booking.com" in url:
-            match = re.search(r'/hotel/\w{2}/(.*?)\.html', url)
-            if match: return match.group(1).replace('-', ' ')
-        if "google.com" in url:
-             match = re.search(r'(ChIJ[a-zA-Z0-9_-]+)', url)
-             if match: return match.group(0)
-    except Exception:
-        pass
-    return "hotel"
-
-def scrape_single_url(url: str, api_key: str) -> Dict[str, Any]:
-    """Scrapes a single hotel URL using the Google Maps engine for reliability."""
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, result in results.items():
+                pipe.set(key, orjson.dumps(result), ex=CACHE_TTL_SECONDS)
+            await pipe.execute()
+    except Exception as e:
+        logging.warning(f"Redis write failed for {len(results)} keys: {e}")
+
+# --- Scraping ---
+@dataclass(slots=True)
+class SourceHandler:
+    """How to query SerpApi for one review source and pick the fields we keep."""
+    build_params: Callable[[str], Dict[str, Any]]
+    parse: Callable[[Dict[str, Any]], Dict[str, Any]]
+    # Tried only when this handler comes back empty, so the slower engine is off the common path.
+    fallback: Optional["SourceHandler"] = None
+    # Query terms this handler can do anything with; others skip straight to the fallback.
+    accepts: Optional[Callable[[str], bool]] = None
+
+def maps_params(query_term: str) -> Dict[str, Any]:
+    """Google Maps engine params for a query term used as-is (e.g. a Place ID)."""
+    return {"engine": "google_maps", "q": query_term, "hl": "en", "gl": "in"}
+
+def city_maps_params(query_term: str) -> Dict[str, Any]:
+    """Google Maps engine params for a hotel name, scoped to Chennai."""
+    return maps_params(f"{query_term} Chennai")
+
+def place_id_params(query_term: str) -> Dict[str, Any]:
+    """Google Maps engine params that look a Place ID up directly instead of searching for it."""
+    return {"engine": "google_maps", "place_id": query_term, "hl": "en", "gl": "in"}
+
+def city_hotels_params(query_term: str) -> Dict[str, Any]:
+    """Google Hotels engine params for a hotel name in Chennai, for a one-night stay from tomorrow."""
+    check_in = date.today() + timedelta(days=1)
+    return {
+        "engine": "google_hotels", "q": f"{query_term} Chennai", "hl": "en", "gl": "in",
+        "check_in_date": check_in.isoformat(),
+        "check_out_date": (check_in + timedelta(days=1)).isoformat(),
+    }
+
+def as_text(value: Any) -> str:
+    """SerpApi text field as a string; null or empty becomes "N/A"."""
+    return str(value) if value not in (None, "") else "N/A"
+
+def as_number(value: Any, kind: Callable[[str], Any]) -> Any:
+    """SerpApi numeric field as an int or float, accepting strings like "1,234"; None if it is not a number."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return kind(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+def parse_place_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Picks the hotel fields out of a Google Maps response; empty if there is no place."""
+    place_results = results.get("place_results", {})
+    if not place_results:
+        return {}
+
+    user_reviews = results.get("reviews") or place_results.get("user_reviews", {}).get("reviews") or []
+    rating_distribution = results.get("rating_distribution") or place_results.get("rating_distribution") or {}
+    
+    review_snippets = [f'"{r.get("snippet", "")}"' for r in user_reviews[:3] if r.get("snippet")]
+    
+    return {
+        "name": as_text(place_results.get("title")),
+        "rating": as_number(place_results.get("rating"), float),
+        "count": as_number(place_results.get("reviews"), int),
+        "address": as_text(place_results.get("address")),
+        "website": as_text(place_results.get("website")),
+        "phone": as_text(place_results.get("phone")),
+        "distribution": rating_distribution if isinstance(rating_distribution, dict) else {},
+        "reviews_snippets": " | ".join(review_snippets) if review_snippets else "N/A"
+    }
+
+def parse_hotel_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Picks the hotel fields out of a Google Hotels property-details response; empty for anything else."""
+    # Only a direct match carries the property at the top level. The "properties" list of a plain search
+    # holds whatever hotels Google ranked, and taking one would save an unrelated hotel under this URL.
+    if not results.get("name"):
+        return {}
+    hotel = results
+
+    return {
+        "name": as_text(hotel.get("name")),
+        "rating": as_number(hotel.get("overall_rating"), float),
+        "count": as_number(hotel.get("reviews"), int),
+        "address": as_text(hotel.get("address")),
+        "website": as_text(hotel.get("link")),
+        "phone": as_text(hotel.get("phone")),
+        "distribution": {
+            str(r["stars"]): r.get("count") for r in hotel.get("ratings") or [] if isinstance(r, dict) and "stars" in r
+        },
+        "reviews_snippets": "N/A"
+    }
+
+# Every source tries the fast Google Maps search first; the fallbacks only run when it finds nothing.
+SOURCES: Dict[str, SourceHandler] = {
+    "Booking.com": SourceHandler(
+        build_params=city_maps_params, parse=parse_place_results,
+        fallback=SourceHandler(build_params=city_hotels_params, parse=parse_hotel_results),
+    ),
+    "TripAdvisor": SourceHandler(
+        build_params=city_maps_params, parse=parse_place_results,
+        fallback=SourceHandler(build_params=city_hotels_params, parse=parse_hotel_results),
+    ),
+    "Google Reviews": SourceHandler(
+        build_params=maps_params, parse=parse_place_results,
+        fallback=SourceHandler(
+            build_params=place_id_params, parse=parse_place_results,
+            accepts=lambda query_term: _G_RE.fullmatch(query_term) is not None,
+        ),
+    ),
+}
+
+async def call_serpapi(client: httpx.AsyncClient, params: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """Runs one SerpApi search and returns the decoded JSON."""
+    async with _scrape_slots:
+        try:
+            r = await asyncio.wait_for(
+                client.get(SERPAPI_URL, params={**params, "api_key": api_key}), SCRAPE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"SerpApi {params['engine']} timed out after {SCRAPE_TIMEOUT_SECONDS}s") from None
+    # Not raise_for_status(): its message embeds the request URL, API key included.
+    if r.status_code != 200:
+        raise RuntimeError(f"SerpApi {params['engine']} returned HTTP {r.status_code}")
+    return orjson.loads(r.content)
+
+async def scrape_single_url(client: httpx.AsyncClient, url: str, api_key: str) -> Dict[str, Any]:
+    """Scrapes a single hotel URL using its source's handler, then its fallbacks until one finds the hotel."""
     source = get_source_from_url(url)
     query_term = extract_query_term_from_url(url)
+    handler = SOURCES.get(source)
     
-    if source == "Unknown" or not query_term:
+    if handler is None or not query_term or query_term == DEFAULT_QUERY_TERM:
         logging.warning(f"Could not determine source or query term for URL: {url}")
         return {}
 
     try:
-        search_query = f"{query_term} Chennai" if source != "Google Reviews" else query_term
-        logging.info(f"Scraping '{search_query}' for source: {source}")
-        
-        params = {
-            "api_key": api_key, "engine": "google_maps",
-            "q": search_query, "hl": "en", "gl": "in"
-        }
+        while handler is not None:
+            if handler.accepts is not None and not handler.accepts(query_term):
+                handler = handler.fallback
+                continue
+            params = handler.build_params(query_term)
+            logging.info(f"Scraping '{query_term}' with {params['engine']} for source: {source}")
 
-        search = GoogleSearch(params)
-        results = search.get_dict()
-
-        place_results = results.get("place_results", {})
-        if not place_results:
-            logging.warning(f"SerpApi found no place_results for '{search_query}'")
-            return {}
-
-        user_reviews = results.get("reviews") or place_results.get("user_reviews", {}).get("reviews") or []
-        rating_distribution = results.get("rating_distribution") or place_results.get("rating_distribution") or {}
-        
-        review_snippets = [f'"{r.get("snippet", "")}"' for r in user_reviews[:3] if r.get("snippet")]
-        
-        return {
-            "name": place_results.get("title", "N/A"),
-            "source": source,
-            "rating": place_results.get("rating"),
-            "count": place_results.get("reviews"),
-            "address": place_results.get("address", "N/A"),
-            "website": place_results.get("website", "N/A"),
-            "phone": place_results.get("phone", "N/A"),
-            "distribution": rating_distribution,
-            "reviews_snippets": " | ".join(review_snippets) if review_snippets else "N/A"
-        }
+            data = handler.parse(await call_serpapi(client, params, api_key))
+            if data:
+                data["source"] = source
+                return data
+            logging.warning(f"SerpApi {params['engine']} found no results for '{query_term}'")
+            handler = handler.fallback
+        return {}
     except Exception as e:
         logging.error(f"Failed to scrape {url}: {e}", exc_info=True)
         return {}
 
+# --- Google Sheets ---
+# The authorized client (and its keep-alive session) and the worksheet handle are created once and shared,
+# so flushes skip the token exchange and metadata round-trips.
+_GOOGLE_CREDS = orjson.loads(os.environ["GOOGLE_CREDENTIALS_JSON"]) if "GOOGLE_CREDENTIALS_JSON" in os.environ else None
+_SHEET_NAME = os.environ.get("SHEET_NAME")
+_WS_LOCK = threading.Lock()
+_gc: Optional[gspread.Client] = None
+_worksheet: Optional[gspread.Worksheet] = None
+
+def _get_worksheet() -> gspread.Worksheet:
+    """Returns the shared AggregatedData worksheet, authorizing and opening it on first use."""
+    global _gc, _worksheet
+    with _WS_LOCK:
+        if _worksheet is None:
+            if _GOOGLE_CREDS is None or not _SHEET_NAME:
+                raise RuntimeError("GOOGLE_CREDENTIALS_JSON and SHEET_NAME must be set.")
+            if _gc is None:
+                _gc = gspread.service_account_from_dict(_GOOGLE_CREDS)
+            _worksheet = _gc.open(_SHEET_NAME).worksheet("AggregatedData")
+        return _worksheet
+
+def _reset_worksheet():
+    """Drops the worksheet handle so the next write reopens it; the authorized client is kept."""
+    global _worksheet
+    with _WS_LOCK:
+        _worksheet = None
+
 def save_to_sheets(all_reviews_data: List[Dict[str, Any]]):
     """Saves the aggregated data to Google Sheets."""
     try:
-        SHEET_NAME = os.environ["SHEET_NAME"]
-        google_creds_json = os.environ["GOOGLE_CREDENTIALS_JSON"]
-        google_creds_dict = json.loads(google_creds_json)
-        
-        gc = gspread.service_account_from_dict(google_creds_dict)
-        spreadsheet = gc.open(SHEET_NAME)
-        worksheet = spreadsheet.worksheet("AggregatedData")
-        
-        rows_to_add = []
-        for data in all_reviews_data:
-            dist = data.get("distribution", {})
-            rating_dist_str = json.dumps(dist) if dist else "{}"
-            rows_to_add.append([
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows_to_add = [
+            [
                 data.get("name", "N/A"), data.get("source", "N/A"),
                 data.get("rating", "N/A"), data.get("count", 0),
                 data.get("address", "N/A"), data.get("website", "N/A"),
-                data.get("phone", "N/A"), rating_dist_str,
+                data.get("phone", "N/A"),
+                orjson.dumps(data["distribution"]).decode() if data.get("distribution") else "{}",
                 data.get("reviews_snippets", "N/A"),
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ])
+                ts
+            ]
+            for data in all_reviews_data
+        ]
         
         if rows_to_add:
-            worksheet.append_rows(rows_to_add, value_input_option='RAW')
+            _get_worksheet().append_rows(rows_to_add, value_input_option='RAW')
             logging.info(f"Successfully appended {len(rows_to_add)} rows to Google Sheet.")
     except Exception as e:
+        # A quota error says nothing about the handle, so only other API errors force a reopen.
+        if isinstance(e, gspread.exceptions.APIError) and e.code != 429:
+            _reset_worksheet()
         logging.error(f"Failed to write to Google Sheets: {e}")
 
-@app.post("/scrape-reviews")
-async def scrape_reviews_endpoint(request: ScrapeRequest, background_tasks: BackgroundTasks):
+# Rows from many requests are coalesced into one append_rows call to stay inside the Sheets write quota.
+SHEETS_FLUSH_INTERVAL = float(os.environ.get("SHEETS_FLUSH_INTERVAL", "2"))
+SHEETS_FLUSH_MAX_ROWS = int(os.environ.get("SHEETS_FLUSH_MAX_ROWS", "500"))
+_row_queue: asyncio.Queue = asyncio.Queue()
+_flusher_task: Optional[asyncio.Task] = None
+
+async def _sheets_flusher():
+    """Drains queued results into batched Sheets writes until it receives the None sentinel."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        data = await _row_queue.get()
+        if data is None:
+            break
+        batch = [data]
+        deadline = loop.time() + SHEETS_FLUSH_INTERVAL
+        while len(batch) < SHEETS_FLUSH_MAX_ROWS:
+            try:
+                data = await asyncio.wait_for(_row_queue.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+            if data is None:
+                stopping = True
+                break
+            batch.append(data)
+        await asyncio.to_thread(save_to_sheets, batch)
+
+@app.on_event("startup")
+async def start_sheets_flusher():
+    global _flusher_task
+    _flusher_task = asyncio.create_task(_sheets_flusher())
+
+@app.on_event("shutdown")
+async def stop_sheets_flusher():
+    if _flusher_task is not None:
+        _row_queue.put_nowait(None)
+        await _flusher_task
+
+@app.post(
+    "/scrape-reviews",
+    response_model=ScrapeResponse,
+    openapi_extra={
+        "requestBody": {"required": True, "content": {"application/json": {"schema": SCRAPE_REQUEST_SCHEMA}}}
+    },
+)
+async def scrape_reviews_endpoint(http_request: Request):
+    try:
+        request = msgspec.json.decode(await http_request.body(), type=ScrapeRequest)
+    except msgspec.DecodeError as e:
+        # Same {"detail": [...]} shape FastAPI uses for its own request validation errors.
+        error_type = "value_error" if isinstance(e, msgspec.ValidationError) else "json_invalid"
+        return JSONResponse({"detail": [{"type": error_type, "loc": ["body"], "msg": str(e)}]}, status_code=422)
+
     api_key = os.environ.get("SERPAPI_KEY")
     if not api_key:
-        return {"error": "API key not configured."}
-
-    scraped_results = []
-    with ThreadPoolExecutor(max_workers=len(request.urls)) as executor:
-        futures = [executor.submit(scrape_single_url, url, api_key) for url in request.urls]
-        for future in futures:
-            result = future.result()
-            if result:
-                scraped_results.append(result)
+        return JSONResponse({"error": "API key not configured."})
+
+    # URLs resolving to the same source and query term are scraped once and fanned back out below.
+    slots: Dict[str, int] = {}
+    urls: List[str] = []
+    keys: List[Optional[str]] = []
+    url_slots = []
+    for url in request.urls:
+        key = cache_key_for_url(url)
+        slot = slots.setdefault(key or url, len(urls))
+        if slot == len(urls):
+            urls.append(url)
+            keys.append(key)
+        url_slots.append(slot)
+
+    results = await get_cached_results(keys)
+
+    # Only URLs that missed the cache go out to SerpApi.
+    misses = [i for i, result in enumerate(results) if result is None]
+    fetched = await asyncio.gather(
+        *[scrape_single_url(http_client, urls[i], api_key) for i in misses],
+        return_exceptions=True,
+    )
+    to_cache = {}
+    for i, result in zip(misses, fetched):
+        if isinstance(result, Exception):
+            logging.error(f"Failed to scrape {urls[i]}: {result}")
+            continue
+        results[i] = result
+        if result and keys[i] is not None:
+            to_cache[keys[i]] = result
+    await cache_results(to_cache)
+
+    scraped_results = [results[slot] for slot in url_slots if results[slot]]
     
-    if scraped_results:
-        background_tasks.add_task(save_to_sheets, scraped_results)
+    for result in scraped_results:
+        _row_queue.put_nowait(result)
 
     return {"data": scraped_results}
 